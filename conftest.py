@@ -0,0 +1,125 @@
+"""
+Shared pytest configuration for the ACP test suites
+"""
+
+import asyncio
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+# Make the app importable once for every test module, whatever directory
+# pytest is started from or which xdist worker is collecting
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# Each process (the main session or one xdist worker) gets a throwaway
+# sqlite database, so parallel workers never race on the same file and a
+# run never touches ./acp_healthcare.db. Must be set before main_system is
+# imported, since the engine is created at import time.
+TEST_DB_DIR = tempfile.mkdtemp(prefix=f"acp-tests-{os.getenv('PYTEST_XDIST_WORKER', 'main')}-")
+atexit.register(shutil.rmtree, TEST_DB_DIR, ignore_errors=True)
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{TEST_DB_DIR}/acp_healthcare.db"
+
+from main_system import app
+from tests.helpers import jload, login
+
+# Test configuration
+TEST_API_KEY = "demo-api-key-2024"
+TEST_HEADERS = {"Authorization": f"Bearer {TEST_API_KEY}"}
+
+# Entering TestClient as a context manager runs the app lifespan (tables,
+# pool warm-up, default admin); only tests that touch stored state need it.
+# Clients are built on first use, so each xdist worker gets its own.
+
+@pytest.fixture(scope="session")
+def client():
+    """Authenticated client with the lifespan run, for query and data tests"""
+    with TestClient(app, headers=TEST_HEADERS) as client:
+        yield client
+
+@pytest.fixture(scope="session")
+def async_client():
+    """Authenticated AsyncClient without lifespan startup, so independent requests can be gathered
+
+    Tests that query stored data should also request client so startup has run.
+    """
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test", headers=TEST_HEADERS
+    )
+    yield client
+    # Each test runs on its own event loop, so teardown gets a fresh one
+    asyncio.run(client.aclose())
+
+@pytest.fixture(scope="session")
+def anon_client():
+    """Client without credentials or lifespan startup, for stateless endpoints
+    (/health, /, docs) and authentication failure tests"""
+    return TestClient(app)
+
+@pytest.fixture(scope="session")
+def cached_get(anon_client):
+    """GET a stateless endpoint once per session and reuse the response
+
+    Only for endpoints whose response does not depend on stored data, such
+    as /health and /; /analytics and other data-backed paths change as the
+    suite posts queries and must be fetched fresh.
+    """
+    responses = {}
+
+    def get(path):
+        if path not in responses:
+            responses[path] = anon_client.get(path)
+        return responses[path]
+
+    return get
+
+def get_payload(client, path):
+    """GET an endpoint with the client's credentials and return its parsed body"""
+    response = client.get(path)
+    assert response.status_code == 200
+    return jload(response)
+
+@pytest.fixture(scope="module")
+def patients_payload(client):
+    """/patients body, fetched once per module"""
+    return get_payload(client, "/patients")
+
+@pytest.fixture(scope="module")
+def services_payload(client):
+    """/services body, fetched once per module"""
+    return get_payload(client, "/services")
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    """Auth headers for the default admin created by the lifespan"""
+    return login(client, "admin", "Admin@123456")
+
+@pytest.fixture(scope="session")
+def plan_id(client, admin_headers):
+    """An insurance plan that policies can be created against"""
+    response = client.post("/plans", headers=admin_headers, json={
+        "name": "Test Silver",
+        "plan_type": "basic",
+        "monthly_premium": 100,
+        "annual_premium": 1100,
+        "coverage_amount": 50000
+    })
+    assert response.status_code == 200, response.text
+    return jload(response)["id"]
+
+@pytest.fixture(scope="session")
+def active_policy(client, admin_headers, plan_id):
+    """An active policy owned by the admin, for payments and claims"""
+    response = client.post("/policies", headers=admin_headers, json={
+        "plan_id": plan_id, "start_date": "2024-01-01T00:00:00"
+    })
+    assert response.status_code == 200, response.text
+    policy_id = jload(response)["id"]
+    assert client.patch(f"/policies/{policy_id}/activate", headers=admin_headers).status_code == 200
+    return policy_id
@@ -6,20 +6,36 @@ Final revised version with all fixes applied
 
 from fastapi import FastAPI, HTTPException, Depends, status, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, Enum as SQLEnum
-from sqlalchemy.orm import declarative_base, sessionmaker, Session, relationship
+from starlette.datastructures import MutableHeaders
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, JSON, Index, Enum as SQLEnum, select, func, case, true, bindparam, event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import declarative_base, relationship, raiseload
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
 from datetime import datetime, timedelta, date
 from typing import Optional, List, Dict, Any
 from passlib.context import CryptContext
-from jose import JWTError, jwt
+from jwt import PyJWTError
+import jwt
+from redis.exceptions import RedisError
+import redis.asyncio as aioredis
+import orjson
+import asyncio
+import contextvars
 import enum
 import os
+import secrets
 import sys
+import time
 from dotenv import load_dotenv
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 import uvicorn
 from contextlib import asynccontextmanager
 
@@ -37,31 +53,92 @@ if sys.platform == "win32":
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Configure logging - request code only enqueues records; the listener thread
+# does the actual stream writes. Nothing is installed at import time, since
+# `python main_system.py` imports this file twice (as __main__, then again
+# as main_system under uvicorn); start_logging() wires it up once per process.
+log_queue = queue.Queue(-1)
+log_stream_handler = logging.StreamHandler()
+log_stream_handler.setFormatter(
+    logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 )
+log_listener = QueueListener(log_queue, log_stream_handler, respect_handler_level=True)
+log_queue_handler = QueueHandler(log_queue)
+log_queue_handler.setFormatter(logging.Formatter('%(message)s'))
 logger = logging.getLogger(__name__)
 
+def start_logging() -> bool:
+    """Attach the QueueHandler to the root logger and start its listener.
+
+    Returns False if a QueueHandler is already installed (e.g. by the
+    __main__ copy of this module), in which case that copy's listener
+    keeps draining the records and the caller must not stop anything.
+    """
+    root = logging.getLogger()
+    if any(isinstance(handler, QueueHandler) for handler in root.handlers):
+        return False
+    root.setLevel(logging.INFO)
+    root.addHandler(log_queue_handler)
+    log_listener.start()
+    return True
+
+def stop_logging():
+    """Flush queued records and detach the QueueHandler installed by start_logging()"""
+    log_listener.stop()
+    logging.getLogger().removeHandler(log_queue_handler)
+
 # Database configuration
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./acp_healthcare.db")
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./acp_healthcare.db")
+
+# Map plain driver URLs (as provided by Railway/Render/Heroku) onto async drivers
+if DATABASE_URL.startswith("sqlite://"):
+    DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+elif DATABASE_URL.startswith("postgres://"):
+    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+asyncpg://", 1)
+elif DATABASE_URL.startswith("postgresql://"):
+    DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+DB_POOL_SIZE = int(os.getenv("CONNECTION_POOL_SIZE", 20))
+DB_MAX_OVERFLOW = int(os.getenv("CONNECTION_POOL_MAX_OVERFLOW", 20))
+
 if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    engine = create_async_engine(DATABASE_URL)
 else:
-    engine = create_engine(DATABASE_URL)
+    # QueuePool is not safe under asyncio; the async adapter must be used
+    engine = create_async_engine(
+        DATABASE_URL,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=1800
+    )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
+# Native JSON column: binary JSONB on PostgreSQL, JSON (stored as text) elsewhere
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
 # Security configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "acp-healthcare-super-secure-secret-key-change-in-production-2024")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# New hashes use argon2; existing bcrypt hashes still verify
+pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Cache configuration (caching is disabled when REDIS_URL is not set)
+REDIS_URL = os.getenv("REDIS_URL")
+redis_client = aioredis.from_url(REDIS_URL) if REDIS_URL else None
+PLANS_CACHE_TTL_SECONDS = 300
+USER_CACHE_TTL_SECONDS = 60  # bounds how long a deactivation can go unnoticed
+REVENUE_CACHE_TTL_SECONDS = 600
+# Bumped on every payment; revenue keys embed it, so old summaries are never
+# read again and simply expire
+REVENUE_GENERATION_KEY = "revenue:generation"
+
 # Enums
 class UserRole(str, enum.Enum):
     ADMIN = "admin"
@@ -92,7 +169,7 @@ class PlanType(str, enum.Enum):
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     email = Column(String, unique=True, index=True, nullable=False)
     username = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
@@ -104,15 +181,17 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    # Relationships - Fixed to avoid ambiguity
-    policies = relationship("Policy", back_populates="user")
-    claims = relationship("Claim", back_populates="user", foreign_keys="[Claim.user_id]")
-    payments = relationship("Payment", back_populates="user")
+    # Relationships - Fixed to avoid ambiguity. All relationships use
+    # lazy="raise" so related rows must be requested with a loader option
+    # instead of being fetched one row at a time during serialization
+    policies = relationship("Policy", back_populates="user", lazy="raise")
+    claims = relationship("Claim", back_populates="user", foreign_keys="[Claim.user_id]", lazy="raise")
+    payments = relationship("Payment", back_populates="user", lazy="raise")
 
 class InsurancePlan(Base):
     __tablename__ = "insurance_plans"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     plan_type = Column(SQLEnum(PlanType), nullable=False)
     description = Column(Text)
@@ -122,17 +201,20 @@ class InsurancePlan(Base):
     deductible = Column(Float, default=0)
     copay_percentage = Column(Float, default=20)
     max_out_of_pocket = Column(Float)
-    benefits = Column(Text)  # JSON string
-    exclusions = Column(Text)  # JSON string
+    benefits = Column(JSONType)
+    exclusions = Column(JSONType)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
-    policies = relationship("Policy", back_populates="plan")
+    policies = relationship("Policy", back_populates="plan", lazy="raise")
 
 class Policy(Base):
     __tablename__ = "policies"
+    __table_args__ = (
+        Index("ix_policy_user_status", "user_id", "status"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     policy_number = Column(String, unique=True, index=True, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"))
     plan_id = Column(Integer, ForeignKey("insurance_plans.id"))
@@ -141,19 +223,23 @@ class Policy(Base):
     status = Column(SQLEnum(PolicyStatus), default=PolicyStatus.PENDING)
     premium_amount = Column(Float, nullable=False)
     payment_frequency = Column(String, default="monthly")
-    beneficiaries = Column(Text)  # JSON string
+    beneficiaries = Column(JSONType)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    user = relationship("User", back_populates="policies")
-    plan = relationship("InsurancePlan", back_populates="policies")
-    claims = relationship("Claim", back_populates="policy")
-    payments = relationship("Payment", back_populates="policy")
+    user = relationship("User", back_populates="policies", lazy="raise")
+    plan = relationship("InsurancePlan", back_populates="policies", lazy="raise")
+    claims = relationship("Claim", back_populates="policy", lazy="raise")
+    payments = relationship("Payment", back_populates="policy", lazy="raise")
 
 class Claim(Base):
     __tablename__ = "claims"
+    __table_args__ = (
+        Index("ix_claim_user_status", "user_id", "status"),
+        Index("ix_claim_date", "claim_date"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     claim_number = Column(String, unique=True, index=True, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"))
     policy_id = Column(Integer, ForeignKey("policies.id"))
@@ -173,13 +259,19 @@ class Claim(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Fixed relationships to avoid foreign key ambiguity
-    user = relationship("User", back_populates="claims", foreign_keys=[user_id])
-    policy = relationship("Policy", back_populates="claims")
+    user = relationship("User", back_populates="claims", foreign_keys=[user_id], lazy="raise")
+    policy = relationship("Policy", back_populates="claims", lazy="raise")
 
 class Payment(Base):
     __tablename__ = "payments"
+    __table_args__ = (
+        Index("ix_payment_user", "user_id"),
+        # Leading payment_date keeps date-range filters SARGable; method and
+        # amount make the revenue aggregates index-only
+        Index("ix_payments_date_method_amount", "payment_date", "payment_method", "amount"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     payment_reference = Column(String, unique=True, index=True, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"))
     policy_id = Column(Integer, ForeignKey("policies.id"))
@@ -191,8 +283,37 @@ class Payment(Base):
     description = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
     
-    user = relationship("User", back_populates="payments")
-    policy = relationship("Policy", back_populates="payments")
+    user = relationship("User", back_populates="payments", lazy="raise")
+    policy = relationship("Policy", back_populates="payments", lazy="raise")
+
+# Fixed-shape statements on hot paths, built once at import; values are passed
+# as bind parameters so every call reuses the same cached compiled SQL
+USER_BY_USERNAME = select(User).where(User.username == bindparam("username"))
+ACTIVE_PLANS_PAGE = (
+    select(InsurancePlan)
+    .where(InsurancePlan.is_active == True)
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+REVENUE_BY_METHOD = (
+    select(
+        Payment.payment_method,
+        func.count(Payment.id).label("count"),
+        func.sum(Payment.amount).label("total")
+    )
+    .group_by(Payment.payment_method)
+)
+# One variant per combination of optional date bounds, keyed by
+# (has start_date, has end_date)
+REVENUE_BY_METHOD_IN_RANGE = {
+    (False, False): REVENUE_BY_METHOD,
+    (True, False): REVENUE_BY_METHOD.where(Payment.payment_date >= bindparam("start_date")),
+    (False, True): REVENUE_BY_METHOD.where(Payment.payment_date <= bindparam("end_date")),
+    (True, True): REVENUE_BY_METHOD.where(
+        Payment.payment_date >= bindparam("start_date"),
+        Payment.payment_date <= bindparam("end_date")
+    ),
+}
 
 # Pydantic Models with Updated Config
 class UserBase(BaseModel):
@@ -312,24 +433,78 @@ class PaymentResponse(PaymentBase):
     
     model_config = ConfigDict(from_attributes=True)
 
-# Dependency functions
-def get_db():
-    db = SessionLocal()
+# Pagination helpers - newest first; pass the X-Next-Cursor header back as
+# after_id to fetch the next page with an index seek instead of an OFFSET scan
+def paginate(stmt, model, skip: int, limit: int, after_id: Optional[int]):
+    stmt = stmt.order_by(model.id.desc()).limit(limit)
+    if after_id is not None:
+        return stmt.where(model.id < after_id)
+    return stmt.offset(skip)
+
+def set_next_cursor(response: Response, rows, limit: int):
+    if rows and len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+
+# Cache helpers - a failing cache is logged and treated as a miss
+async def cache_get(key: str) -> Optional[bytes]:
+    if redis_client is None:
+        return None
+    try:
+        return await redis_client.get(key)
+    except RedisError as e:
+        logger.warning("Cache read failed for %s: %s", key, e)
+        return None
+
+async def cache_set(key: str, value: bytes, ttl: int):
+    if redis_client is None:
+        return
+    try:
+        await redis_client.set(key, value, ex=ttl)
+    except RedisError as e:
+        logger.warning("Cache write failed for %s: %s", key, e)
+
+async def cache_delete(*keys: str):
+    if redis_client is None:
+        return
+    try:
+        await redis_client.delete(*keys)
+    except RedisError as e:
+        logger.warning("Cache invalidation failed for %s: %s", keys, e)
+
+async def cache_incr(key: str):
+    if redis_client is None:
+        return
+    try:
+        await redis_client.incr(key)
+    except RedisError as e:
+        logger.warning("Cache invalidation failed for %s: %s", key, e)
+
+async def cache_delete_pattern(pattern: str):
+    if redis_client is None:
+        return
     try:
+        keys = [key async for key in redis_client.scan_iter(match=pattern)]
+        if keys:
+            await redis_client.delete(*keys)
+    except RedisError as e:
+        logger.warning("Cache invalidation failed for %s: %s", pattern, e)
+
+# Dependency functions
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-# Authentication functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# Authentication functions - hashing is CPU-bound, so it runs off the event loop
+async def verify_password(plain_password, hashed_password):
+    return await asyncio.to_thread(pwd_context.verify, plain_password, hashed_password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    return await asyncio.to_thread(pwd_context.hash, password)
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = db.query(User).filter(User.username == username).first()
-    if not user or not verify_password(password, user.hashed_password):
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    result = await db.execute(USER_BY_USERNAME, {"username": username})
+    user = result.scalars().first()
+    if not user or not await verify_password(password, user.hashed_password):
         return False
     return user
 
@@ -343,7 +518,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -355,11 +533,26 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         if username is None:
             raise credentials_exception
         token_data = TokenData(username=username)
-    except JWTError:
+    except PyJWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.username == token_data.username).first()
+    
+    cache_key = f"user:{token_data.username}"
+    cached = await cache_get(cache_key)
+    if cached:
+        return User(**UserResponse.model_validate_json(cached).model_dump())
+    
+    result = await db.execute(USER_BY_USERNAME, {"username": token_data.username})
+    user = result.scalars().first()
     if user is None:
         raise credentials_exception
+    
+    # Only serialize when there is a cache to put the result in
+    if redis_client is not None:
+        await cache_set(
+            cache_key,
+            UserResponse.model_validate(user).model_dump_json().encode(),
+            USER_CACHE_TTL_SECONDS
+        )
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
@@ -367,7 +560,15 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
-def check_admin(current_user: User = Depends(get_current_active_user)):
+async def require_admin(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+):
+    # Resolves token, user, active flag and role in one dependency instead of
+    # the get_current_user -> get_current_active_user -> admin check chain
+    current_user = await get_current_user(token, db)
+    if not current_user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -375,65 +576,71 @@ def check_admin(current_user: User = Depends(get_current_active_user)):
         )
     return current_user
 
-# Utility functions
+# Utility functions - 10 hex characters from the OS CSPRNG in a single call
 def generate_policy_number():
-    import random
-    import string
-    return 'POL' + ''.join(random.choices(string.digits, k=10))
+    return 'POL' + secrets.token_hex(5).upper()
 
 def generate_claim_number():
-    import random
-    import string
-    return 'CLM' + ''.join(random.choices(string.digits, k=10))
+    return 'CLM' + secrets.token_hex(5).upper()
 
 def generate_payment_reference():
-    import random
-    import string
-    return 'PAY' + ''.join(random.choices(string.digits, k=10))
+    return 'PAY' + secrets.token_hex(5).upper()
 
 # Lifespan management
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    owns_logging = start_logging()
     logger.info("Starting ACP Healthcare Insurance System...")
     try:
-        Base.metadata.create_all(bind=engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
         logger.info("Database tables created/verified successfully")
         
+        # Open the pool's connections up front so the first requests don't pay for them
+        if isinstance(engine.pool, AsyncAdaptedQueuePool):
+            connections = await asyncio.gather(*(engine.connect() for _ in range(DB_POOL_SIZE)))
+            await asyncio.gather(*(conn.close() for conn in connections))
+            logger.info("Database connection pool warmed with %s connections", DB_POOL_SIZE)
+        
         # Create default admin user if not exists
-        db = SessionLocal()
-        try:
-            admin = db.query(User).filter(User.username == "admin").first()
-            if not admin:
-                admin_user = User(
-                    email="admin@acp-health.com",
-                    username="admin",
-                    hashed_password=get_password_hash("Admin@123456"),
-                    full_name="System Administrator",
-                    role=UserRole.ADMIN,
-                    is_active=True
-                )
-                db.add(admin_user)
-                db.commit()
-                logger.info("Default admin user created")
-            else:
-                logger.info("Default admin user already exists")
-        except Exception as e:
-            logger.error(f"Error creating default admin: {e}")
-            db.rollback()
-        finally:
-            db.close()
+        async with SessionLocal() as db:
+            try:
+                result = await db.execute(USER_BY_USERNAME, {"username": "admin"})
+                admin = result.scalars().first()
+                if not admin:
+                    admin_user = User(
+                        email="admin@acp-health.com",
+                        username="admin",
+                        hashed_password=await get_password_hash("Admin@123456"),
+                        full_name="System Administrator",
+                        role=UserRole.ADMIN,
+                        is_active=True
+                    )
+                    db.add(admin_user)
+                    await db.commit()
+                    logger.info("Default admin user created")
+                else:
+                    logger.info("Default admin user already exists")
+            except Exception as e:
+                logger.error("Error creating default admin: %s", e)
+                await db.rollback()
         
         logger.info("System ready to accept requests")
         
     except Exception as e:
-        logger.error(f"Startup error: {e}")
+        logger.error("Startup error: %s", e)
         raise
     
     yield
     
     # Shutdown
     logger.info("Shutting down ACP Healthcare Insurance System...")
+    if redis_client is not None:
+        await redis_client.aclose()
+    await engine.dispose()
+    if owns_logging:
+        stop_logging()
 
 # App configuration with lifespan
 app = FastAPI(
@@ -442,18 +649,76 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/api/docs",
     redoc_url="/api/redoc",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
-# CORS configuration
+# Compress JSON listings; small payloads aren't worth the CPU
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# CORS configuration - credentials are only allowed for explicitly listed origins
+CORS_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("CORS_ORIGINS", "http://localhost:3000,http://localhost:8001").split(",")
+    if origin.strip()
+]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Configure appropriately for production
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Browsers hide non-safelisted response headers from scripts unless exposed
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Request timing - database time is accumulated per request by the cursor
+# events below and reported next to the total in a Server-Timing header
+request_db_time = contextvars.ContextVar("request_db_time", default=None)
+
+# The query start time is kept on the per-statement execution context rather than
+# the pooled connection, so a failing statement (no after_cursor_execute)
+# leaves nothing behind.
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    context.query_start_time = time.perf_counter()
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.query_start_time
+    db_time = request_db_time.get()
+    if db_time is not None:
+        db_time[0] += elapsed
+
+class ServerTimingMiddleware:
+    """Adds Server-Timing: app;dur=..., db;dur=... (milliseconds) to responses"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        db_time = [0.0]
+        token = request_db_time.set(db_time)
+        start = time.perf_counter()
+        
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                app_ms = (time.perf_counter() - start) * 1000
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", f"app;dur={app_ms:.1f}, db;dur={db_time[0] * 1000:.1f}")
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_db_time.reset(token)
+
+app.add_middleware(ServerTimingMiddleware)
+
 # API Routes
 
 @app.get("/", tags=["Health"])
@@ -475,19 +740,9 @@ def health_check():
 
 # Authentication endpoints
 @app.post("/register", response_model=UserResponse, tags=["Authentication"])
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    # Check if user exists
-    db_user = db.query(User).filter(
-        (User.email == user.email) | (User.username == user.username)
-    ).first()
-    if db_user:
-        raise HTTPException(
-            status_code=400,
-            detail="Email or username already registered"
-        )
-    
-    # Create new user
-    hashed_password = get_password_hash(user.password)
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    # Create new user; the unique indexes on email/username reject duplicates
+    hashed_password = await get_password_hash(user.password)
     db_user = User(
         email=user.email,
         username=user.username,
@@ -498,15 +753,21 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         role=user.role
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="Email or username already registered"
+        )
     
-    logger.info(f"New user registered: {user.username}")
+    logger.info("New user registered: %s", user.username)
     return db_user
 
 @app.post("/token", response_model=Token, tags=["Authentication"])
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -531,51 +792,69 @@ async def read_users_me(current_user: User = Depends(get_current_active_user)):
 
 # Insurance Plans endpoints
 @app.post("/plans", response_model=InsurancePlanResponse, tags=["Insurance Plans"])
-def create_plan(
+async def create_plan(
     plan: InsurancePlanCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(check_admin)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_admin)
 ):
-    import json
-    db_plan = InsurancePlan(
-        **plan.model_dump(exclude={'benefits', 'exclusions'}),
-        benefits=json.dumps(plan.benefits) if plan.benefits else None,
-        exclusions=json.dumps(plan.exclusions) if plan.exclusions else None
-    )
+    db_plan = InsurancePlan(**plan.model_dump())
     db.add(db_plan)
-    db.commit()
-    db.refresh(db_plan)
+    await db.commit()
+    await cache_delete_pattern("plans:list:*")
     
-    logger.info(f"New insurance plan created: {plan.name}")
+    logger.info("New insurance plan created: %s", plan.name)
     return db_plan
 
 @app.get("/plans", response_model=List[InsurancePlanResponse], tags=["Insurance Plans"])
-def get_plans(
+async def get_plans(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    plans = db.query(InsurancePlan).filter(InsurancePlan.is_active == True).offset(skip).limit(limit).all()
-    return plans
+    cache_key = f"plans:list:{skip}:{limit}"
+    cached = await cache_get(cache_key)
+    if cached:
+        return Response(content=cached, media_type="application/json")
+    
+    result = await db.execute(ACTIVE_PLANS_PAGE, {"skip": skip, "limit": limit})
+    plans = result.scalars().all()
+    if redis_client is None:
+        return plans
+    
+    # Serialize once; the same bytes are cached and sent
+    body = orjson.dumps([
+        InsurancePlanResponse.model_validate(plan).model_dump(mode="json") for plan in plans
+    ])
+    await cache_set(cache_key, body, PLANS_CACHE_TTL_SECONDS)
+    return Response(content=body, media_type="application/json")
 
 @app.get("/plans/{plan_id}", response_model=InsurancePlanResponse, tags=["Insurance Plans"])
-def get_plan(plan_id: int, db: Session = Depends(get_db)):
-    plan = db.query(InsurancePlan).filter(InsurancePlan.id == plan_id).first()
+async def get_plan(plan_id: int, db: AsyncSession = Depends(get_db)):
+    cache_key = f"plans:{plan_id}"
+    cached = await cache_get(cache_key)
+    if cached:
+        return Response(content=cached, media_type="application/json")
+    
+    plan = await db.get(InsurancePlan, plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
-    return plan
+    
+    if redis_client is None:
+        return plan
+    
+    body = orjson.dumps(InsurancePlanResponse.model_validate(plan).model_dump(mode="json"))
+    await cache_set(cache_key, body, PLANS_CACHE_TTL_SECONDS)
+    return Response(content=body, media_type="application/json")
 
 # Policy endpoints
 @app.post("/policies", response_model=PolicyResponse, tags=["Policies"])
-def create_policy(
+async def create_policy(
     policy: PolicyCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    import json
-    
     # Get the plan
-    plan = db.query(InsurancePlan).filter(InsurancePlan.id == policy.plan_id).first()
+    plan = await db.get(InsurancePlan, policy.plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="Insurance plan not found")
     
@@ -596,36 +875,40 @@ def create_policy(
         end_date=end_date,
         premium_amount=premium_amount,
         payment_frequency=policy.payment_frequency,
-        beneficiaries=json.dumps(policy.beneficiaries) if policy.beneficiaries else None,
+        beneficiaries=policy.beneficiaries,
         status=PolicyStatus.PENDING
     )
     db.add(db_policy)
-    db.commit()
-    db.refresh(db_policy)
+    await db.commit()
     
-    logger.info(f"New policy created: {db_policy.policy_number} for user {current_user.username}")
+    logger.info("New policy created: %s for user %s", db_policy.policy_number, current_user.username)
     return db_policy
 
 @app.get("/policies", response_model=List[PolicyResponse], tags=["Policies"])
-def get_policies(
+async def get_policies(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    after_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    if current_user.role == UserRole.ADMIN:
-        policies = db.query(Policy).offset(skip).limit(limit).all()
-    else:
-        policies = db.query(Policy).filter(Policy.user_id == current_user.id).offset(skip).limit(limit).all()
+    # raiseload turns any relationship access without a loader option into an error
+    stmt = select(Policy).options(raiseload("*"))
+    if current_user.role != UserRole.ADMIN:
+        stmt = stmt.where(Policy.user_id == current_user.id)
+    result = await db.execute(paginate(stmt, Policy, skip, limit, after_id))
+    policies = result.scalars().all()
+    set_next_cursor(response, policies, limit)
     return policies
 
 @app.get("/policies/{policy_id}", response_model=PolicyResponse, tags=["Policies"])
-def get_policy(
+async def get_policy(
     policy_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    policy = db.query(Policy).filter(Policy.id == policy_id).first()
+    policy = await db.get(Policy, policy_id)
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
     
@@ -636,31 +919,31 @@ def get_policy(
     return policy
 
 @app.patch("/policies/{policy_id}/activate", response_model=PolicyResponse, tags=["Policies"])
-def activate_policy(
+async def activate_policy(
     policy_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(check_admin)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_admin)
 ):
-    policy = db.query(Policy).filter(Policy.id == policy_id).first()
+    policy = await db.get(Policy, policy_id)
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
     
     policy.status = PolicyStatus.ACTIVE
-    db.commit()
-    db.refresh(policy)
+    await db.commit()
+    await db.refresh(policy)
     
-    logger.info(f"Policy activated: {policy.policy_number}")
+    logger.info("Policy activated: %s", policy.policy_number)
     return policy
 
 # Claims endpoints
 @app.post("/claims", response_model=ClaimResponse, tags=["Claims"])
-def create_claim(
+async def create_claim(
     claim: ClaimCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     # Verify policy belongs to user
-    policy = db.query(Policy).filter(Policy.id == claim.policy_id).first()
+    policy = await db.get(Policy, claim.policy_id)
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
     
@@ -676,38 +959,41 @@ def create_claim(
         **claim.model_dump()
     )
     db.add(db_claim)
-    db.commit()
-    db.refresh(db_claim)
+    await db.commit()
     
-    logger.info(f"New claim created: {db_claim.claim_number} for policy {policy.policy_number}")
+    logger.info("New claim created: %s for policy %s", db_claim.claim_number, policy.policy_number)
     return db_claim
 
 @app.get("/claims", response_model=List[ClaimResponse], tags=["Claims"])
-def get_claims(
+async def get_claims(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    after_id: Optional[int] = None,
     status: Optional[ClaimStatus] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    query = db.query(Claim)
+    stmt = select(Claim).options(raiseload("*"))
     
     if current_user.role != UserRole.ADMIN:
-        query = query.filter(Claim.user_id == current_user.id)
+        stmt = stmt.where(Claim.user_id == current_user.id)
     
     if status:
-        query = query.filter(Claim.status == status)
+        stmt = stmt.where(Claim.status == status)
     
-    claims = query.offset(skip).limit(limit).all()
+    result = await db.execute(paginate(stmt, Claim, skip, limit, after_id))
+    claims = result.scalars().all()
+    set_next_cursor(response, claims, limit)
     return claims
 
 @app.get("/claims/{claim_id}", response_model=ClaimResponse, tags=["Claims"])
-def get_claim(
+async def get_claim(
     claim_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    claim = db.query(Claim).filter(Claim.id == claim_id).first()
+    claim = await db.get(Claim, claim_id)
     if not claim:
         raise HTTPException(status_code=404, detail="Claim not found")
     
@@ -717,13 +1003,13 @@ def get_claim(
     return claim
 
 @app.patch("/claims/{claim_id}", response_model=ClaimResponse, tags=["Claims"])
-def update_claim(
+async def update_claim(
     claim_id: int,
     claim_update: ClaimUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    claim = db.query(Claim).filter(Claim.id == claim_id).first()
+    claim = await db.get(Claim, claim_id)
     if not claim:
         raise HTTPException(status_code=404, detail="Claim not found")
     
@@ -744,21 +1030,21 @@ def update_claim(
         claim.notes = update_data["notes"]
     
     claim.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(claim)
+    await db.commit()
+    await db.refresh(claim)
     
-    logger.info(f"Claim updated: {claim.claim_number} by {current_user.username}")
+    logger.info("Claim updated: %s by %s", claim.claim_number, current_user.username)
     return claim
 
 # Payments endpoints
 @app.post("/payments", response_model=PaymentResponse, tags=["Payments"])
-def create_payment(
+async def create_payment(
     payment: PaymentCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     # Verify policy
-    policy = db.query(Policy).filter(Policy.id == payment.policy_id).first()
+    policy = await db.get(Policy, payment.policy_id)
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
     
@@ -771,179 +1057,190 @@ def create_payment(
         **payment.model_dump()
     )
     db.add(db_payment)
-    db.commit()
-    db.refresh(db_payment)
+    await db.commit()
+    await cache_incr(REVENUE_GENERATION_KEY)
     
-    logger.info(f"Payment created: {db_payment.payment_reference} for policy {policy.policy_number}")
+    logger.info("Payment created: %s for policy %s", db_payment.payment_reference, policy.policy_number)
     return db_payment
 
 @app.get("/payments", response_model=List[PaymentResponse], tags=["Payments"])
-def get_payments(
+async def get_payments(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    after_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    if current_user.role == UserRole.ADMIN:
-        payments = db.query(Payment).offset(skip).limit(limit).all()
-    else:
-        payments = db.query(Payment).filter(Payment.user_id == current_user.id).offset(skip).limit(limit).all()
+    stmt = select(Payment).options(raiseload("*"))
+    if current_user.role != UserRole.ADMIN:
+        stmt = stmt.where(Payment.user_id == current_user.id)
+    result = await db.execute(paginate(stmt, Payment, skip, limit, after_id))
+    payments = result.scalars().all()
+    set_next_cursor(response, payments, limit)
     return payments
 
 # Dashboard endpoints
 @app.get("/dashboard/stats", tags=["Dashboard"])
-def get_dashboard_stats(
-    db: Session = Depends(get_db),
+async def get_dashboard_stats(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
+    # Each subquery aggregates one table into a single row; cross-joining them
+    # returns every counter in one round trip.
     if current_user.role == UserRole.ADMIN:
-        total_users = db.query(User).count()
-        total_policies = db.query(Policy).count()
-        active_policies = db.query(Policy).filter(Policy.status == PolicyStatus.ACTIVE).count()
-        total_claims = db.query(Claim).count()
-        pending_claims = db.query(Claim).filter(Claim.status == ClaimStatus.SUBMITTED).count()
-        total_revenue = db.query(Payment).count() * 1000  # Simplified calculation
-        
-        return {
-            "total_users": total_users,
-            "total_policies": total_policies,
-            "active_policies": active_policies,
-            "total_claims": total_claims,
-            "pending_claims": pending_claims,
-            "total_revenue": total_revenue
-        }
+        aggregates = [
+            select(func.count(User.id).label("total_users")),
+            select(
+                func.count(Policy.id).label("total_policies"),
+                func.count(case((Policy.status == PolicyStatus.ACTIVE, 1))).label("active_policies")
+            ),
+            select(
+                func.count(Claim.id).label("total_claims"),
+                func.count(case((Claim.status == ClaimStatus.SUBMITTED, 1))).label("pending_claims")
+            ),
+            select(func.coalesce(func.sum(Payment.amount), 0).label("total_revenue"))
+        ]
     else:
-        user_policies = db.query(Policy).filter(Policy.user_id == current_user.id).count()
-        user_active_policies = db.query(Policy).filter(
-            Policy.user_id == current_user.id,
-            Policy.status == PolicyStatus.ACTIVE
-        ).count()
-        user_claims = db.query(Claim).filter(Claim.user_id == current_user.id).count()
-        user_payments = db.query(Payment).filter(Payment.user_id == current_user.id).count()
-        
-        return {
-            "total_policies": user_policies,
-            "active_policies": user_active_policies,
-            "total_claims": user_claims,
-            "total_payments": user_payments
-        }
+        aggregates = [
+            select(
+                func.count(Policy.id).label("total_policies"),
+                func.count(case((Policy.status == PolicyStatus.ACTIVE, 1))).label("active_policies")
+            ).where(Policy.user_id == current_user.id),
+            select(func.count(Claim.id).label("total_claims")).where(Claim.user_id == current_user.id),
+            select(func.count(Payment.id).label("total_payments")).where(Payment.user_id == current_user.id)
+        ]
+    
+    stats = aggregates[0].subquery()
+    for aggregate in aggregates[1:]:
+        stats = stats.join(aggregate.subquery(), true())
+    
+    result = await db.execute(select(stats))
+    return dict(result.one()._mapping)
 
 # Admin endpoints
 @app.get("/admin/users", response_model=List[UserResponse], tags=["Admin"])
-def get_all_users(
+async def get_all_users(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(check_admin)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_admin)
 ):
-    users = db.query(User).offset(skip).limit(limit).all()
-    return users
+    result = await db.execute(select(User).offset(skip).limit(limit))
+    return result.scalars().all()
 
 @app.patch("/admin/users/{user_id}/deactivate", response_model=UserResponse, tags=["Admin"])
-def deactivate_user(
+async def deactivate_user(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(check_admin)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_admin)
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     user.is_active = False
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    await cache_delete(f"user:{user.username}")
     
-    logger.info(f"User deactivated: {user.username} by admin {current_user.username}")
+    logger.info("User deactivated: %s by admin %s", user.username, current_user.username)
     return user
 
 # Reports endpoints
 @app.get("/reports/claims-summary", tags=["Reports"])
-def get_claims_summary(
+async def get_claims_summary(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    query = db.query(Claim)
+    stmt = select(
+        Claim.status,
+        func.count(Claim.id).label("count"),
+        func.coalesce(func.sum(Claim.claim_amount), 0).label("claimed"),
+        func.coalesce(func.sum(Claim.approved_amount), 0).label("approved")
+    ).group_by(Claim.status)
     
     if current_user.role != UserRole.ADMIN:
-        query = query.filter(Claim.user_id == current_user.id)
+        stmt = stmt.where(Claim.user_id == current_user.id)
     
     if start_date:
-        query = query.filter(Claim.claim_date >= start_date)
+        stmt = stmt.where(Claim.claim_date >= start_date)
     if end_date:
-        query = query.filter(Claim.claim_date <= end_date)
+        stmt = stmt.where(Claim.claim_date <= end_date)
     
-    claims = query.all()
+    result = await db.execute(stmt)
+    rows = result.all()
+    
+    by_status = {claim_status.value: 0 for claim_status in ClaimStatus}
+    for row in rows:
+        by_status[row.status.value] = row.count
     
     summary = {
-        "total_claims": len(claims),
-        "total_claimed_amount": sum(c.claim_amount for c in claims),
-        "total_approved_amount": sum(c.approved_amount for c in claims),
-        "by_status": {
-            "submitted": len([c for c in claims if c.status == ClaimStatus.SUBMITTED]),
-            "under_review": len([c for c in claims if c.status == ClaimStatus.UNDER_REVIEW]),
-            "approved": len([c for c in claims if c.status == ClaimStatus.APPROVED]),
-            "rejected": len([c for c in claims if c.status == ClaimStatus.REJECTED]),
-            "paid": len([c for c in claims if c.status == ClaimStatus.PAID])
-        }
+        "total_claims": sum(row.count for row in rows),
+        "total_claimed_amount": sum(row.claimed for row in rows),
+        "total_approved_amount": sum(row.approved for row in rows),
+        "by_status": by_status
     }
     
     return summary
 
 @app.get("/reports/revenue-summary", tags=["Reports"])
-def get_revenue_summary(
+async def get_revenue_summary(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(check_admin)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_admin)
 ):
-    query = db.query(Payment)
-    
-    if start_date:
-        query = query.filter(Payment.payment_date >= start_date)
-    if end_date:
-        query = query.filter(Payment.payment_date <= end_date)
-    
-    payments = query.all()
+    generation = (await cache_get(REVENUE_GENERATION_KEY) or b"0").decode()
+    cache_key = f"revenue:{generation}:{start_date}:{end_date}"
+    cached = await cache_get(cache_key)
+    if cached:
+        return Response(content=cached, media_type="application/json")
     
-    summary = {
-        "total_payments": len(payments),
-        "total_revenue": sum(p.amount for p in payments),
-        "average_payment": sum(p.amount for p in payments) / len(payments) if payments else 0,
-        "by_method": {}
-    }
-    
-    # Group by payment method
-    from collections import defaultdict
-    method_totals = defaultdict(float)
-    for payment in payments:
-        method_totals[payment.payment_method] += payment.amount
-    
-    summary["by_method"] = dict(method_totals)
+    # One scan grouped by payment method; overall totals are rolled up
+    # from the (few) method rows
+    stmt = REVENUE_BY_METHOD_IN_RANGE[start_date is not None, end_date is not None]
+    result = await db.execute(stmt, {"start_date": start_date, "end_date": end_date})
+    rows = result.all()
+    if not rows:
+        # No payments in the window, so there is nothing to roll up
+        summary = {"total_payments": 0, "total_revenue": 0.0, "average_payment": 0.0, "by_method": {}}
+    else:
+        total_payments = sum(row.count for row in rows)
+        total_revenue = sum(row.total for row in rows)
+        summary = {
+            "total_payments": total_payments,
+            "total_revenue": total_revenue,
+            "average_payment": total_revenue / total_payments,
+            "by_method": {row.payment_method: row.total for row in rows}
+        }
     
+    if redis_client is not None:
+        await cache_set(cache_key, orjson.dumps(summary), REVENUE_CACHE_TTL_SECONDS)
     return summary
 
 # Error handlers - Fixed version
 @app.exception_handler(404)
 async def not_found_handler(request: Request, exc):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=404,
         content={"detail": "Resource not found"}
     )
 
 @app.exception_handler(500)
 async def internal_error_handler(request: Request, exc):
-    logger.error(f"Internal server error: {exc}")
-    return JSONResponse(
+    logger.error("Internal server error: %s", exc)
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Internal server error"}
     )
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Unhandled exception: {exc}")
-    return JSONResponse(
+    logger.error("Unhandled exception: %s", exc)
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "An unexpected error occurred"}
     )
@@ -952,14 +1249,25 @@ if __name__ == "__main__":
     # Get port from environment or use default
     port = int(os.getenv("PORT", 8001))
     
-    logger.info(f"Starting Production ACP Healthcare Insurance System on port {port}")
-    logger.info(f"System accessible at http://localhost:{port}")
-    logger.info(f"API documentation at http://localhost:{port}/api/docs")
-    
-    uvicorn.run(
-        "main_system:app",
-        host="0.0.0.0",
-        port=port,
-        reload=bool(os.getenv("DEBUG", False)),
-        log_level="info"
-    )
\ No newline at end of file
+    # Installed here so these lines are shown; the app's lifespan then
+    # finds the handler already in place and leaves it to this block
+    start_logging()
+    logger.info("Starting Production ACP Healthcare Insurance System on port %s", port)
+    logger.info("System accessible at http://localhost:%s", port)
+    logger.info("API documentation at http://localhost:%s/api/docs", port)
+    
+    # UVICORN_RELOAD (falling back to DEBUG) only enables the file watcher for
+    # explicit truthy values, so DEBUG=False or DEBUG=0 leaves it off
+    reload_flag = os.getenv("UVICORN_RELOAD", os.getenv("DEBUG", ""))
+    reload = reload_flag.strip().lower() in {"1", "true", "yes", "on"}
+    
+    try:
+        uvicorn.run(
+            "main_system:app",
+            host="0.0.0.0",
+            port=port,
+            reload=reload,
+            log_level="info"
+        )
+    finally:
+        stop_logging()
\ No newline at end of file
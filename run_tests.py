@@ -4,52 +4,60 @@ ACP Healthcare System - Test Runner
 Comprehensive testing before cloud deployment
 """
 
+import shlex
 import subprocess
 import sys
-import os
+import threading
 import time
 from pathlib import Path
 
-def run_command(command, description):
-    """Run a command and return success/failure"""
+def run_command(command, description, timeout=300):
+    """Run a command, streaming its output, and return success/failure
+    
+    Command output is passed through to stdout as raw bytes and never decoded.
+    """
     print(f"\n{'='*60}")
     print(f"🧪 {description}")
-    print(f"{'='*60}")
+    print(f"{'='*60}", flush=True)
     
     try:
-        result = subprocess.run(
-            command, 
-            shell=True, 
-            capture_output=True, 
-            text=True,
-            timeout=300  # 5 minute timeout
+        process = subprocess.Popen(
+            shlex.split(command),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT
         )
-        
-        if result.returncode == 0:
-            print(f"✅ {description} - SUCCESS")
-            if result.stdout:
-                print(result.stdout)
-            return True
-        else:
-            print(f"❌ {description} - FAILED")
-            print(f"Error: {result.stderr}")
-            if result.stdout:
-                print(f"Output: {result.stdout}")
-            return False
-            
-    except subprocess.TimeoutExpired:
-        print(f"⏰ {description} - TIMEOUT")
-        return False
     except Exception as e:
         print(f"💥 {description} - EXCEPTION: {e}")
         return False
+    
+    # The pipe is read until EOF, so the timeout is enforced by killing
+    # the process rather than by wait()
+    timer = threading.Timer(timeout, process.kill)
+    timer.start()
+    try:
+        for line in process.stdout:
+            sys.stdout.buffer.write(line)
+            sys.stdout.buffer.flush()
+        returncode = process.wait()
+    finally:
+        timed_out = not timer.is_alive()
+        timer.cancel()
+    
+    if timed_out:
+        print(f"⏰ {description} - TIMEOUT")
+        return False
+    if returncode == 0:
+        print(f"✅ {description} - SUCCESS")
+        return True
+    print(f"❌ {description} - FAILED (exit code {returncode})")
+    return False
 
 def check_project_structure():
     """Check if required files exist"""
     required_files = [
         "requirements.txt",
         "setup_system.py",
-        "src/main_system.py"
+        "main_system.py"
     ]
     
     missing_files = []
@@ -81,121 +89,33 @@ def main():
         print("❌ Dependency installation failed")
         return False
     
-    # Step 3: Verify critical imports
-    verify_imports = """
-python -c "
-import sqlalchemy
-import fastapi
-import pydantic
-import uvicorn
-print('✅ All critical dependencies available')
-print(f'SQLAlchemy: {sqlalchemy.__version__}')
-print(f'FastAPI: {fastapi.__version__}')
-print(f'Pydantic: {pydantic.__version__}')
-"
-    """
-    
-    if not run_command(verify_imports, "Verifying Critical Dependencies"):
-        print("❌ Dependency verification failed")
-        return False
-    
-    # Step 4: Initialize system data
+    # Step 3: Initialize system data
     if not run_command("python setup_system.py", "Initializing System Data"):
         print("❌ System initialization failed")
         return False
     
-    # Step 5: Test system imports
-    test_imports = """
-python -c "
-import sys
-sys.path.append('src')
-try:
-    from main_system import app
-    print('✅ Main system module imported successfully')
-except ImportError as e:
-    print(f'❌ Import error: {e}')
-    sys.exit(1)
-"
-    """
-    
-    if not run_command(test_imports, "Testing System Module Imports"):
-        print("❌ System module import failed")
-        return False
-    
-    # Step 6: Run unit tests if available
+    # Steps 4-6 run one after another: both pytest suites already spread
+    # across every core with xdist, so overlapping them (or the perf check)
+    # would only oversubscribe the CPU
+    steps = [
+        # Dependency, import, API smoke and performance checks share one interpreter
+        ("python -m scripts.ci_checks", "Running System Checks", "❌ System checks failed"),
+        ("python test_acp_system.py", "Running ACP System Tests", "❌ ACP system tests failed"),
+    ]
+    # Unit tests are optional and a failure there does not stop the run
     if Path("tests").exists():
-        if not run_command("python -m pytest tests/ -v --tb=short", "Running Unit Tests"):
-            print("⚠️ Unit tests failed, but continuing...")
+        steps.insert(1, ("python -m pytest tests/ -v --tb=short -n auto --dist loadgroup", "Running Unit Tests", None))
     
-    # Step 7: Run our comprehensive test suite
-    if not run_command("python test_acp_system.py", "Running ACP System Tests"):
-        print("❌ ACP system tests failed")
-        return False
-    
-    # Step 8: Test API endpoints directly
-    test_api = """
-python -c "
-import sys
-sys.path.append('src')
-from fastapi.testclient import TestClient
-from main_system import app
-
-client = TestClient(app)
-
-# Test health endpoint
-response = client.get('/health')
-if response.status_code == 200:
-    print('✅ Health endpoint working')
-else:
-    print(f'❌ Health endpoint failed: {response.status_code}')
-    sys.exit(1)
-
-# Test root endpoint
-response = client.get('/')
-if response.status_code == 200:
-    print('✅ Root endpoint working')
-else:
-    print(f'❌ Root endpoint failed: {response.status_code}')
-    sys.exit(1)
-
-print('✅ Basic API endpoints functional')
-"
-    """
-    
-    if not run_command(test_api, "Testing Basic API Endpoints"):
-        print("❌ API endpoint tests failed")
-        return False
-    
-    # Step 9: Performance test
-    performance_test = """
-python -c "
-import sys
-import time
-sys.path.append('src')
-from fastapi.testclient import TestClient
-from main_system import app
-
-client = TestClient(app)
-
-# Performance test
-start_time = time.time()
-for i in range(10):
-    response = client.get('/health')
-    if response.status_code != 200:
-        print(f'❌ Performance test failed at iteration {i}')
-        sys.exit(1)
-
-end_time = time.time()
-avg_time = (end_time - start_time) / 10 * 1000
-
-print(f'✅ Performance test passed: {avg_time:.2f}ms average response time')
-if avg_time > 1000:
-    print('⚠️ Response time is high, consider optimization')
-"
-    """
-    
-    if not run_command(performance_test, "Running Performance Tests"):
-        print("❌ Performance tests failed")
+    failed = False
+    for command, description, failure_message in steps:
+        if run_command(command, description):
+            continue
+        if failure_message is None:
+            print("⚠️ Unit tests failed, but continuing...")
+        else:
+            print(failure_message)
+            failed = True
+    if failed:
         return False
     
     # Final summary
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+ACP Healthcare System - CI Checks
+Dependency, import, smoke and performance checks run in a single process,
+so FastAPI, SQLAlchemy and the app are only imported once
+
+Usage:
+    python -m scripts.ci_checks                 # run every check
+    python -m scripts.ci_checks perf_health     # run the named checks only
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+def verify_deps():
+    """Check that the critical dependencies are importable"""
+    try:
+        import sqlalchemy
+        import fastapi
+        import pydantic
+        import uvicorn
+    except ImportError as e:
+        print(f"❌ Missing dependency: {e}")
+        return False
+
+    print("✅ All critical dependencies available")
+    print(f"SQLAlchemy: {sqlalchemy.__version__}")
+    print(f"FastAPI: {fastapi.__version__}")
+    print(f"Pydantic: {pydantic.__version__}")
+    return True
+
+def test_imports():
+    """Check that the main system module imports"""
+    try:
+        from main_system import app
+    except ImportError as e:
+        print(f"❌ Import error: {e}")
+        return False
+
+    print("✅ Main system module imported successfully")
+    return True
+
+def api_client():
+    """AsyncClient that calls the app in-process, shared by the API checks"""
+    import httpx
+    from main_system import app
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+async def smoke_endpoints(client):
+    """Check that the unauthenticated endpoints respond"""
+    for path, name in (("/health", "Health"), ("/", "Root")):
+        response = await client.get(path)
+        if response.status_code != 200:
+            print(f"❌ {name} endpoint failed: {response.status_code}")
+            return False
+        print(f"✅ {name} endpoint working")
+
+    print("✅ Basic API endpoints functional")
+    return True
+
+async def perf_health(client, requests=None):
+    """Benchmark /health with concurrent requests; PERF_REQUESTS sets the load"""
+    # statistics.quantiles needs at least two samples
+    requests = max(2, requests or int(os.getenv("PERF_REQUESTS", "200")))
+
+    async def timed_get():
+        start = time.perf_counter()
+        response = await client.get("/health")
+        return response.status_code, (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(timed_get() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    failures = sum(1 for status, _ in results if status != 200)
+    if failures:
+        print(f"❌ Performance test failed: {failures} of {requests} requests did not return 200")
+        return False
+
+    cuts = statistics.quantiles([latency for _, latency in results], n=100)
+    p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    print(f"✅ Performance test passed: {requests} concurrent requests at {requests / elapsed:.0f} req/s")
+    print(f"   Latency p50 {p50:.2f}ms, p95 {p95:.2f}ms, p99 {p99:.2f}ms")
+    if p95 > 1000:
+        print("⚠️ Response time is high, consider optimization")
+    return True
+
+async def run_with_client(*checks):
+    """Run API checks in order against one shared client"""
+    async with api_client() as client:
+        for check in checks:
+            if not await check(client):
+                return False
+    return True
+
+CHECKS = {
+    "verify_deps": verify_deps,
+    "test_imports": test_imports,
+}
+
+# Checks that take a client; the selected ones share a single run_with_client
+API_CHECKS = {
+    "smoke_endpoints": smoke_endpoints,
+    "perf_health": perf_health,
+}
+
+def main(names=None):
+    """Run the named checks (all by default), stopping at the first failure
+
+    Environment checks run first, then every selected API check against one
+    shared client.
+    """
+    names = names or [*CHECKS, *API_CHECKS]
+    unknown = [name for name in names if name not in CHECKS and name not in API_CHECKS]
+    if unknown:
+        print(f"❌ Unknown checks: {', '.join(unknown)} (available: {', '.join([*CHECKS, *API_CHECKS])})")
+        return False
+
+    if not all(CHECKS[name]() for name in names if name in CHECKS):
+        return False
+    api_checks = [API_CHECKS[name] for name in names if name in API_CHECKS]
+    return not api_checks or asyncio.run(run_with_client(*api_checks))
+
+if __name__ == "__main__":
+    sys.exit(0 if main(sys.argv[1:]) else 1)
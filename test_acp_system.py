@@ -4,70 +4,77 @@ Testing Sequential Workflow Engine with Real Healthcare Data
 """
 
 import pytest
-import asyncio
 import json
-from fastapi.testclient import TestClient
+import orjson
 from unittest.mock import Mock, patch
-import sys
-import os
 
-# Add src to path for imports
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from tests.helpers import jload
 
-# Import your main application
-try:
-    from main_system import app
-    from workflow_engine import WorkflowEngine
-    from data_models import Patient, InsurancePlan, CPTCode
-except ImportError as e:
-    print(f"Import error: {e}")
-    print("Make sure your src directory has the main modules")
+# Real identifiers that must never appear in patient records
+FORBIDDEN_PATIENT_FIELDS = frozenset({"ssn", "phone", "address"})
 
-# Test client
-client = TestClient(app)
+# Query bodies shared by several tests, encoded once and sent as raw content
+JSON_HEADERS = {"Content-Type": "application/json"}
+ROUTINE_QUERY_BYTES = orjson.dumps({
+    "patient_id": "PT000001",
+    "cpt_codes": ["99213"],  # Office visit
+    "facility_type": "outpatient",
+    "urgency": "routine"
+})
+HIGH_COST_QUERY_BYTES = orjson.dumps({
+    "patient_id": "PT000001",
+    "cpt_codes": ["29881"],  # Arthroscopy knee
+    "facility_type": "outpatient"
+})
+MULTI_SERVICE_QUERY_BYTES = orjson.dumps({
+    "patient_id": "PT000002",
+    "cpt_codes": ["99213", "80053", "71020"],  # Visit + Lab + X-ray
+    "facility_type": "outpatient"
+})
 
-# Test configuration
-TEST_API_KEY = "demo-api-key-2024"
-TEST_HEADERS = {"Authorization": f"Bearer {TEST_API_KEY}"}
+@pytest.fixture(scope="session")
+def seeded_workflow_id(client):
+    """Run one routine workflow and share its ID with tests that only read it"""
+    response = client.post("/query", headers=JSON_HEADERS, content=ROUTINE_QUERY_BYTES)
+    assert response.status_code == 200
+    return jload(response)["workflow_id"]
 
 class TestACPSystemHealth:
     """Test basic system health and setup"""
     
-    def test_health_endpoint(self):
+    def test_health_endpoint(self, cached_get):
         """Test system health endpoint"""
-        response = client.get("/health")
+        response = cached_get("/health")
         assert response.status_code == 200
-        data = response.json()
+        data = jload(response)
         assert "status" in data
         assert data["status"] == "healthy"
     
-    def test_root_endpoint(self):
+    def test_root_endpoint(self, cached_get):
         """Test root endpoint with system info"""
-        response = client.get("/")
+        response = cached_get("/")
         assert response.status_code == 200
-        data = response.json()
+        data = jload(response)
         assert "system" in data
         assert "ACP Healthcare Insurance System" in str(data)
     
-    def test_api_authentication(self):
+    @pytest.mark.parametrize("headers", [{}, {"Authorization": "Bearer invalid-key"}], ids=["no_auth", "invalid_auth"])
+    def test_api_authentication(self, anon_client, headers):
         """Test API authentication requirement"""
-        # Test without auth header
-        response = client.post("/query", json={})
-        assert response.status_code == 401
-        
-        # Test with invalid auth
-        headers = {"Authorization": "Bearer invalid-key"}
-        response = client.post("/query", headers=headers, json={})
+        response = anon_client.post("/query", headers=headers, json={})
         assert response.status_code == 401
 
 class TestPatientDataIntegration:
     """Test Synthea patient data integration"""
     
-    def test_patient_lookup(self):
+    @pytest.mark.asyncio
+    async def test_patient_lookup(self, async_client, patients_payload):
         """Test patient data retrieval"""
-        response = client.get("/patients", headers=TEST_HEADERS)
+        # Fresh request, so a broken endpoint is not hidden behind the cached payload
+        response = await async_client.get("/patients")
         assert response.status_code == 200
-        data = response.json()
+        
+        data = patients_payload
         assert "patients" in data
         assert len(data["patients"]) > 0
         
@@ -77,27 +84,20 @@ class TestPatientDataIntegration:
         assert "demographics" in patient
         assert "insurance_plan" in patient
     
-    def test_patient_anonymization(self):
+    def test_patient_anonymization(self, patients_payload):
         """Test HIPAA compliance - patient data anonymization"""
-        response = client.get("/patients", headers=TEST_HEADERS)
-        data = response.json()
-        
-        for patient in data["patients"]:
+        for patient in patients_payload["patients"]:
             # Ensure no real identifiers
-            assert "ssn" not in patient
-            assert "phone" not in patient
-            assert "address" not in patient
+            assert not FORBIDDEN_PATIENT_FIELDS & patient.keys()
             # Should have anonymized IDs
             assert patient["patient_id"].startswith("PT")
 
 class TestCPTCodeIntegration:
     """Test CMS CPT code integration"""
     
-    def test_service_catalog(self):
+    def test_service_catalog(self, services_payload):
         """Test CPT code service catalog"""
-        response = client.get("/services", headers=TEST_HEADERS)
-        assert response.status_code == 200
-        data = response.json()
+        data = services_payload
         assert "services" in data
         assert len(data["services"]) > 0
         
@@ -108,73 +108,37 @@ class TestCPTCodeIntegration:
         assert "rvu_work" in service
         assert "medicare_rate" in service
 
+@pytest.mark.usefixtures("client")  # lifespan startup before queries
 class TestSequentialWorkflow:
     """Test 7-step sequential workflow engine"""
     
-    def test_routine_primary_care_workflow(self):
-        """Test routine primary care visit workflow"""
-        query_data = {
-            "patient_id": "PT000001",
-            "cpt_codes": ["99213"],  # Office visit
-            "facility_type": "outpatient",
-            "urgency": "routine"
-        }
-        
-        response = client.post("/query", headers=TEST_HEADERS, json=query_data)
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("query_bytes,approval_statuses", [
+        # Auto-approved for routine care
+        pytest.param(ROUTINE_QUERY_BYTES, ["auto_approved", "approved"], id="routine_primary_care"),
+        # High-cost procedures may require prior auth
+        pytest.param(HIGH_COST_QUERY_BYTES, ["approved", "pending", "requires_prior_auth", "auto_approved"],
+                     id="high_cost_procedure"),
+        pytest.param(MULTI_SERVICE_QUERY_BYTES, ["approved", "pending", "requires_prior_auth", "auto_approved"],
+                     id="multi_service"),
+    ])
+    async def test_workflow_scenario(self, async_client, query_bytes, approval_statuses):
+        """Test a workflow runs to completion with the expected approval and costs"""
+        response = await async_client.post("/query", headers=JSON_HEADERS, content=query_bytes)
         assert response.status_code == 200
         
-        data = response.json()
+        data = jload(response)
         assert data["success"] is True
         assert "workflow_id" in data
         assert "data" in data
         
         # Check workflow completion
         workflow_data = data["data"]
-        assert "approval_status" in workflow_data
-        assert "financial_summary" in workflow_data
         assert "processing_time_ms" in workflow_data
+        assert workflow_data["approval_status"] in approval_statuses
         
-        # Should be auto-approved for routine care
-        assert workflow_data["approval_status"] in ["auto_approved", "approved"]
-    
-    def test_high_cost_procedure_workflow(self):
-        """Test high-cost procedure requiring prior auth"""
-        query_data = {
-            "patient_id": "PT000001",
-            "cpt_codes": ["29881"],  # Arthroscopy knee
-            "facility_type": "outpatient"
-        }
-        
-        response = client.post("/query", headers=TEST_HEADERS, json=query_data)
-        assert response.status_code == 200
-        
-        data = response.json()
-        assert data["success"] is True
-        
-        # High-cost procedures may require prior auth
-        workflow_data = data["data"]
-        assert "approval_status" in workflow_data
-        # Status could be approved, pending, or requires_prior_auth
-        assert workflow_data["approval_status"] in [
-            "approved", "pending", "requires_prior_auth", "auto_approved"
-        ]
-    
-    def test_multi_service_workflow(self):
-        """Test workflow with multiple CPT codes"""
-        query_data = {
-            "patient_id": "PT000002",
-            "cpt_codes": ["99213", "80053", "71020"],  # Visit + Lab + X-ray
-            "facility_type": "outpatient"
-        }
-        
-        response = client.post("/query", headers=TEST_HEADERS, json=query_data)
-        assert response.status_code == 200
-        
-        data = response.json()
-        assert data["success"] is True
-        
-        # Check financial calculation for multiple services
-        financial = data["data"]["financial_summary"]
+        # Check financial calculation for the requested services
+        financial = workflow_data["financial_summary"]
         assert "total_cost" in financial
         assert "insurance_pays" in financial
         assert "patient_pays" in financial
@@ -183,130 +147,103 @@ class TestSequentialWorkflow:
 class TestWorkflowStatusTracking:
     """Test workflow status and tracking"""
     
-    def test_workflow_creation_and_tracking(self):
-        """Test workflow creation and status tracking"""
-        # Create a workflow
-        query_data = {
-            "patient_id": "PT000001",
-            "cpt_codes": ["99213"],
-            "facility_type": "outpatient"
-        }
-        
-        response = client.post("/query", headers=TEST_HEADERS, json=query_data)
-        assert response.status_code == 200
-        
-        workflow_id = response.json()["workflow_id"]
-        
-        # Check workflow status
-        status_response = client.get(f"/workflow/{workflow_id}", headers=TEST_HEADERS)
+    @pytest.mark.xdist_group("seeded_workflow")
+    def test_workflow_creation_and_tracking(self, client, seeded_workflow_id):
+        """Test workflow status tracking for a created workflow"""
+        status_response = client.get(f"/workflow/{seeded_workflow_id}")
         assert status_response.status_code == 200
         
-        status_data = status_response.json()
+        status_data = jload(status_response)
         assert "workflow_id" in status_data
         assert "status" in status_data
         assert "steps_completed" in status_data
 
+@pytest.mark.usefixtures("client")  # lifespan startup before queries
 class TestInsurancePlans:
     """Test insurance plan integration"""
     
-    def test_different_insurance_plans(self):
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("patient_id,expected_plan", [
+        ("PT000001", "BCBS Gold PPO"),
+        ("PT000002", "Aetna Silver HMO"),
+        ("PT000003", "Kaiser Bronze")
+    ])
+    async def test_different_insurance_plans(self, async_client, patient_id, expected_plan):
         """Test processing with different insurance plans"""
-        test_cases = [
-            {"patient_id": "PT000001", "expected_plan": "BCBS Gold PPO"},
-            {"patient_id": "PT000002", "expected_plan": "Aetna Silver HMO"},
-            {"patient_id": "PT000003", "expected_plan": "Kaiser Bronze"}
-        ]
+        query_data = {
+            "patient_id": patient_id,
+            "cpt_codes": ["99213"],
+            "facility_type": "outpatient"
+        }
+        
+        response = await async_client.post("/query", json=query_data)
+        assert response.status_code == 200
         
-        for case in test_cases:
-            query_data = {
-                "patient_id": case["patient_id"],
-                "cpt_codes": ["99213"],
-                "facility_type": "outpatient"
-            }
-            
-            response = client.post("/query", headers=TEST_HEADERS, json=query_data)
-            assert response.status_code == 200
-            
-            data = response.json()
-            assert data["success"] is True
+        data = jload(response)
+        assert data["success"] is True, f"Query for a {expected_plan} patient failed"
 
 class TestPerformanceMetrics:
     """Test system performance and analytics"""
     
-    def test_analytics_endpoint(self):
+    @pytest.mark.xdist_group("serial")
+    def test_analytics_endpoint(self, client):
         """Test system analytics endpoint"""
-        response = client.get("/analytics", headers=TEST_HEADERS)
+        response = client.get("/analytics")
         assert response.status_code == 200
         
-        data = response.json()
+        data = jload(response)
         assert "metrics" in data
         metrics = data["metrics"]
         assert "total_queries" in metrics
         assert "average_processing_time" in metrics
         assert "success_rate" in metrics
     
-    def test_response_time_performance(self):
-        """Test API response time performance"""
-        import time
-        
-        query_data = {
-            "patient_id": "PT000001",
-            "cpt_codes": ["99213"],
-            "facility_type": "outpatient"
-        }
-        
-        start_time = time.time()
-        response = client.post("/query", headers=TEST_HEADERS, json=query_data)
-        end_time = time.time()
-        
-        response_time_ms = (end_time - start_time) * 1000
+    def test_query_latency(self, client, benchmark):
+        """Benchmark /query latency; only runs with --benchmark-only"""
+        response = benchmark.pedantic(
+            lambda: client.post("/query", headers=JSON_HEADERS, content=ROUTINE_QUERY_BYTES),
+            rounds=20
+        )
         
         assert response.status_code == 200
-        # Should respond within 1 second for production readiness
-        assert response_time_ms < 1000
+        # Should respond within 1 second on average for production readiness
+        assert benchmark.stats["mean"] < 1.0
 
 class TestErrorHandling:
     """Test error handling and edge cases"""
     
-    def test_invalid_patient_id(self):
-        """Test handling of invalid patient ID"""
-        query_data = {
+    @pytest.mark.parametrize("query_data,allowed_statuses,expected_success", [
+        pytest.param({
             "patient_id": "INVALID_ID",
             "cpt_codes": ["99213"],
             "facility_type": "outpatient"
-        }
-        
-        response = client.post("/query", headers=TEST_HEADERS, json=query_data)
-        # Should handle gracefully
-        assert response.status_code in [200, 400, 404]
-        
-        if response.status_code == 200:
-            data = response.json()
-            assert data["success"] is False
-    
-    def test_invalid_cpt_code(self):
-        """Test handling of invalid CPT code"""
-        query_data = {
+        }, [200, 400, 404], False, id="invalid_patient_id"),
+        pytest.param({
             "patient_id": "PT000001",
             "cpt_codes": ["INVALID"],
             "facility_type": "outpatient"
-        }
-        
-        response = client.post("/query", headers=TEST_HEADERS, json=query_data)
-        assert response.status_code in [200, 400]
+        }, [200, 400], None, id="invalid_cpt_code"),
+    ])
+    def test_invalid_query(self, client, query_data, allowed_statuses, expected_success):
+        """Test handling of invalid patient IDs and CPT codes"""
+        response = client.post("/query", json=query_data)
+        # Should handle gracefully
+        assert response.status_code in allowed_statuses
         
         if response.status_code == 200:
-            data = response.json()
-            # Should handle invalid codes gracefully
+            data = jload(response)
             assert "success" in data
+            # Unknown patients must fail; invalid codes only need a graceful answer
+            if expected_success is not None:
+                assert data["success"] is expected_success
 
 class TestDataValidation:
     """Test Pydantic data validation"""
     
-    def test_request_validation(self):
+    def test_request_validation(self, client):
         """Test request data validation"""
         # Missing required fields
-        response = client.post("/query", headers=TEST_HEADERS, json={})
+        response = client.post("/query", json={})
         assert response.status_code == 422  # Validation error
         
         # Invalid data types
@@ -314,7 +251,7 @@ class TestDataValidation:
             "patient_id": 123,  # Should be string
             "cpt_codes": "99213",  # Should be list
         }
-        response = client.post("/query", headers=TEST_HEADERS, json=invalid_data)
+        response = client.post("/query", json=invalid_data)
         assert response.status_code == 422
 
 # Pytest configuration and fixtures
@@ -346,5 +283,5 @@ if __name__ == "__main__":
     print("Running ACP Healthcare System Tests...")
     pytest.main([
         __file__ + "::TestACPSystemHealth",
-        "-v", "--tb=short"
+        "-v", "--tb=short", "-n", "auto", "--dist", "loadgroup"
     ])
\ No newline at end of file
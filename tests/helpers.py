@@ -0,0 +1,28 @@
+"""
+Helpers shared by the test suites
+"""
+
+import secrets
+
+import orjson
+
+def jload(response):
+    """Parse a JSON response body with orjson, which is quicker on large payloads"""
+    return orjson.loads(response.content)
+
+def login(client, username, password):
+    """Log in through /token and return the bearer Authorization header"""
+    response = client.post("/token", data={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {jload(response)['access_token']}"}
+
+def register_customer(client):
+    """Register a customer with a unique username and return its auth headers"""
+    username = f"customer_{secrets.token_hex(4)}"
+    response = client.post("/register", json={
+        "email": f"{username}@example.com",
+        "username": username,
+        "password": "password123"
+    })
+    assert response.status_code == 200, response.text
+    return login(client, username, "password123")
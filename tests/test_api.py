@@ -2,72 +2,233 @@
 Corrected test_api.py - Fix the failing authentication test
 """
 
-import pytest
-from fastapi.testclient import TestClient
-from main_system import app
+import asyncio
+from datetime import datetime, timedelta
 
-client = TestClient(app)
+import fakeredis
+import pytest
+import main_system
+from main_system import generate_policy_number, generate_claim_number, generate_payment_reference
+from tests.helpers import register_customer
 
-def test_health_endpoint():
+def test_health_endpoint(cached_get):
     """Test that health endpoint works without auth"""
-    response = client.get("/health")
+    response = cached_get("/health")
     assert response.status_code == 200
     data = response.json()
     assert "status" in data
     assert data["status"] == "healthy"
 
-def test_root_endpoint():
+def test_root_endpoint(cached_get):
     """Test that root endpoint works without auth"""
-    response = client.get("/")
+    response = cached_get("/")
     assert response.status_code == 200
     data = response.json()
     assert "message" in data
 
-def test_unauthenticated_query_fails():
-    """Test that protected endpoints fail without authentication"""
-    
-    # Test /me endpoint (should require auth)
-    response = client.get("/me")
-    assert response.status_code == 401  # Unauthorized, not 403 or 404
-    
-    # Test /policies endpoint (should require auth)  
-    response = client.get("/policies")
-    assert response.status_code == 401  # Unauthorized
-    
-    # Test /claims endpoint (should require auth)
-    response = client.get("/claims")
-    assert response.status_code == 401  # Unauthorized
-    
-    # Test creating a policy without auth (should require auth)
-    policy_data = {
+@pytest.mark.parametrize("headers", [{}, {"Authorization": "Bearer invalid-key"}], ids=["no_auth", "invalid_auth"])
+@pytest.mark.parametrize("method,path,body", [
+    ("get", "/me", None),
+    ("get", "/policies", None),
+    ("get", "/claims", None),
+    # Creating a policy also requires auth
+    ("post", "/policies", {
         "plan_id": 1,
         "start_date": "2024-01-01T00:00:00",
         "payment_frequency": "monthly"
-    }
-    response = client.post("/policies", json=policy_data)
-    assert response.status_code == 401  # Unauthorized
+    })
+])
+def test_unauthenticated_query_fails(anon_client, headers, method, path, body):
+    """Test that protected endpoints fail without valid authentication"""
+    response = anon_client.request(method, path, headers=headers, json=body)
+    assert response.status_code == 401  # Unauthorized, not 403 or 404
 
-def test_admin_endpoints_require_admin():
+def test_admin_endpoints_require_admin(anon_client):
     """Test that admin endpoints require admin role"""
     
     # Test admin endpoint without auth
-    response = client.get("/admin/users")
+    response = anon_client.get("/admin/users")
     assert response.status_code == 401  # Should be unauthorized first
     
-def test_documentation_accessible():
+@pytest.mark.asyncio
+async def test_documentation_accessible(async_client):
     """Test that API documentation is accessible"""
+    # Fetch the docs and redoc pages together over one client
+    docs, redoc = await asyncio.gather(async_client.get("/api/docs"), async_client.get("/api/redoc"))
+    assert docs.status_code == 200
+    assert redoc.status_code == 200
+
+def test_large_responses_are_compressed(anon_client):
+    """Test that responses above the gzip threshold are compressed"""
+    response = anon_client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    
+    # Small payloads are sent as-is
+    response = anon_client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+def test_server_timing_header(cached_get):
+    """Test that responses report app and database time"""
+    response = cached_get("/health")
+    assert response.status_code == 200
+    assert response.headers["server-timing"].startswith("app;dur=")
+    assert "db;dur=" in response.headers["server-timing"]
+
+def test_server_timing_reports_db_time(client):
+    """Test that query time is reported for an authenticated, DB-backed request"""
+    token = client.post(
+        "/token", data={"username": "admin", "password": "Admin@123456"}
+    ).json()["access_token"]
+    response = client.get("/policies", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    db_dur = response.headers["server-timing"].split("db;dur=")[1]
+    assert float(db_dur) > 0
+
+def test_payment_invalidates_cached_revenue_summary(client, admin_headers, active_policy, monkeypatch):
+    """Test that a new payment is reflected in the next cached revenue summary"""
+    redis = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(main_system, "redis_client", redis)
+    
+    before = client.get("/reports/revenue-summary", headers=admin_headers).json()
+    # The summary is cached under the current generation
+    assert client.portal.call(redis.exists, "revenue:0:None:None") == 1
+    
+    response = client.post("/payments", headers=admin_headers, json={
+        "policy_id": active_policy, "amount": 40, "payment_method": "cache_test"
+    })
+    assert response.status_code == 200
+    
+    after = client.get("/reports/revenue-summary", headers=admin_headers).json()
+    assert after["total_payments"] == before["total_payments"] + 1
+    assert after["by_method"]["cache_test"] == 40
+
+# Payments are dated utcnow, so a day either side brackets the one posted below
+TODAY = datetime.utcnow().date()
+REVENUE_WINDOW_START = str(TODAY - timedelta(days=1))
+REVENUE_WINDOW_END = str(TODAY + timedelta(days=1))
+
+@pytest.mark.parametrize("start_date,end_date", [
+    (None, None),
+    (REVENUE_WINDOW_START, None),
+    (None, REVENUE_WINDOW_END),
+    (REVENUE_WINDOW_START, REVENUE_WINDOW_END),
+], ids=["no_bounds", "start_only", "end_only", "both_bounds"])
+def test_revenue_summary_date_bounds(client, admin_headers, active_policy, start_date, end_date):
+    """Test that each date-bound variant counts a new payment and rolls up by method"""
+    params = {k: v for k, v in {"start_date": start_date, "end_date": end_date}.items() if v}
+    method = f"bounds_{'start' if start_date else ''}{'end' if end_date else ''}"
+    before = client.get("/reports/revenue-summary", headers=admin_headers, params=params).json()
+    
+    response = client.post("/payments", headers=admin_headers, json={
+        "policy_id": active_policy, "amount": 25, "payment_method": method
+    })
+    assert response.status_code == 200
     
-    # Test docs endpoint
-    response = client.get("/api/docs")
+    after = client.get("/reports/revenue-summary", headers=admin_headers, params=params).json()
+    assert after["total_payments"] == before["total_payments"] + 1
+    assert after["total_revenue"] == pytest.approx(before["total_revenue"] + 25)
+    assert after["average_payment"] == pytest.approx(after["total_revenue"] / after["total_payments"])
+    assert after["by_method"][method] == 25
+    assert sum(after["by_method"].values()) == pytest.approx(after["total_revenue"])
+
+def test_revenue_summary_empty_window(client, admin_headers):
+    """Test that a window without payments returns zeroed totals"""
+    response = client.get("/reports/revenue-summary", headers=admin_headers, params={
+        "start_date": "2000-01-01", "end_date": "2000-12-31"
+    })
     assert response.status_code == 200
+    assert response.json() == {
+        "total_payments": 0, "total_revenue": 0.0, "average_payment": 0.0, "by_method": {}
+    }
+
+def test_duplicate_username_registration_fails(client):
+    """Test that registering a taken username is rejected"""
+    response = client.post("/register", json={
+        "email": "another_admin@example.com",
+        "username": "admin",
+        "password": "password123"
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email or username already registered"
+
+def test_dashboard_stats(client, admin_headers, plan_id):
+    """Test that admins see system-wide counters and customers only their own"""
+    admin_before = client.get("/dashboard/stats", headers=admin_headers).json()
     
-    # Test redoc endpoint  
-    response = client.get("/api/redoc")
+    headers = register_customer(client)
+    policy_ids = [
+        client.post("/policies", headers=headers, json={
+            "plan_id": plan_id, "start_date": "2024-01-01T00:00:00"
+        }).json()["id"]
+        for _ in range(2)
+    ]
+    assert client.patch(f"/policies/{policy_ids[0]}/activate", headers=admin_headers).status_code == 200
+    response = client.post("/claims", headers=headers, json={
+        "policy_id": policy_ids[0],
+        "service_date": "2024-02-01T00:00:00",
+        "provider_name": "Test Clinic",
+        "claim_amount": 150
+    })
     assert response.status_code == 200
+    for amount in (30, 45):
+        response = client.post("/payments", headers=headers, json={
+            "policy_id": policy_ids[0], "amount": amount, "payment_method": "dashboard_test"
+        })
+        assert response.status_code == 200
+    
+    assert client.get("/dashboard/stats", headers=headers).json() == {
+        "total_policies": 2, "active_policies": 1, "total_claims": 1, "total_payments": 2
+    }
+    
+    admin_after = client.get("/dashboard/stats", headers=admin_headers).json()
+    assert admin_after["total_users"] == admin_before["total_users"] + 1
+    assert admin_after["total_policies"] == admin_before["total_policies"] + 2
+    assert admin_after["active_policies"] == admin_before["active_policies"] + 1
+    assert admin_after["total_claims"] == admin_before["total_claims"] + 1
+    assert admin_after["pending_claims"] == admin_before["pending_claims"] + 1
+    assert admin_after["total_revenue"] == pytest.approx(admin_before["total_revenue"] + 75)
+
+def test_cors_exposes_pagination_cursor(anon_client):
+    """Test that browser clients can read the keyset pagination header"""
+    response = anon_client.get("/health", headers={"Origin": "http://localhost:3000"})
+    assert response.status_code == 200
+    assert "X-Next-Cursor" in response.headers["access-control-expose-headers"]
+
+def test_policies_keyset_pagination(client, plan_id):
+    """Test that a full page sets X-Next-Cursor and after_id seeks past it"""
+    headers = register_customer(client)
+    created = [
+        client.post("/policies", headers=headers, json={
+            "plan_id": plan_id, "start_date": "2024-01-01T00:00:00"
+        }).json()["id"]
+        for _ in range(3)
+    ]
+    
+    first = client.get("/policies", headers=headers, params={"limit": 2})
+    assert first.status_code == 200
+    assert [p["id"] for p in first.json()] == created[:0:-1]
+    cursor = first.headers["X-Next-Cursor"]
+    assert cursor == str(created[1])
+    
+    # The last page is short, so there is nothing further to fetch
+    last = client.get("/policies", headers=headers, params={"limit": 2, "after_id": cursor})
+    assert last.status_code == 200
+    assert [p["id"] for p in last.json()] == created[:1]
+    assert "X-Next-Cursor" not in last.headers
+
+def test_reference_number_format():
+    """Test generated policy/claim/payment numbers keep their prefix and length"""
+    for generate, prefix in [
+        (generate_policy_number, "POL"),
+        (generate_claim_number, "CLM"),
+        (generate_payment_reference, "PAY")
+    ]:
+        number = generate()
+        assert number.startswith(prefix)
+        assert len(number) == 13
+        assert number[3:].isalnum() and number[3:].upper() == number[3:]
 
 if __name__ == "__main__":
-    # Run individual tests
-    test_health_endpoint()
-    test_root_endpoint() 
-    test_unauthenticated_query_fails()
-    print("✅ All tests passed!")
\ No newline at end of file
+    # Run the tests in this file
+    pytest.main([__file__, "-v", "--tb=short"])
\ No newline at end of file